@@ -1,5 +1,6 @@
 import streamlit as st
-from chatbot import app
+from chatbot import run_turn
+from scheduler import DeadlineExceeded
 from langchain_core.messages import AIMessage, HumanMessage
 from tools import get_all_customers, get_data_protection_check_logs
 
@@ -20,11 +21,14 @@ with main_col:
     if user_input:
         st.session_state.message_history.append(HumanMessage(content=user_input))
 
-        response = app.invoke({
-            'messages': st.session_state.message_history
-        })
-
-        st.session_state.message_history = response['messages']
+        try:
+            response = run_turn(st.session_state.message_history)
+            st.session_state.message_history = response['messages']
+        except DeadlineExceeded:
+            # Answer the pending message so the history never holds two user messages in a row
+            st.session_state.message_history.append(AIMessage(
+                content="Sorry, we're a little overbaked with requests right now 🧁 Please send that again in a moment!"
+            ))
 
     for i in range(1, len(st.session_state.message_history) + 1):
         this_message = st.session_state.message_history[-i]
@@ -0,0 +1,77 @@
+import argparse
+import json
+import os
+import time
+from typing import List
+import numpy as np
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from embeddings import get_embedding_backend
+
+FAQ_FILE_PATH = './cake_FAQ.json'
+
+
+def load_answer_chunks(faq_file_path: str):
+    """Index answer chunks only, so a question can't trivially retrieve itself"""
+    with open(faq_file_path, 'r') as f:
+        faqs = json.load(f)
+
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=30)
+    texts, labels = [], []
+    for i, faq in enumerate(faqs):
+        for chunk in text_splitter.split_text(faq['answer']):
+            texts.append(chunk)
+            labels.append(i)
+    return faqs, texts, np.array(labels)
+
+
+def benchmark(backend: str, k: int) -> dict:
+    """Recall@k of each FAQ question against the answer chunks, plus indexing and query latency"""
+    embeddings, namespace = get_embedding_backend(backend)
+    faqs, texts, labels = load_answer_chunks(FAQ_FILE_PATH)
+
+    start = time.perf_counter()
+    index = np.array(embeddings.embed_documents(texts))
+    index_seconds = time.perf_counter() - start
+    index /= np.linalg.norm(index, axis=1, keepdims=True)
+
+    hits = 0
+    latencies: List[float] = []
+    for i, faq in enumerate(faqs):
+        start = time.perf_counter()
+        query = np.array(embeddings.embed_query(faq['question']))
+        scores = index @ (query / np.linalg.norm(query))
+        top_chunks = np.argsort(-scores)
+        latencies.append(time.perf_counter() - start)
+
+        top_faqs = []
+        for chunk in top_chunks:
+            if labels[chunk] not in top_faqs:
+                top_faqs.append(labels[chunk])
+            if len(top_faqs) == k:
+                break
+        hits += i in top_faqs
+
+    return {
+        "backend": namespace,
+        f"recall@{k}": hits / len(faqs),
+        "index_seconds": index_seconds,
+        "query_p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "query_p95_ms": float(np.percentile(latencies, 95) * 1000),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare embedding backends on cake_FAQ.json")
+    parser.add_argument('--backends', nargs='+', default=['local', 'google'])
+    parser.add_argument('-k', type=int, default=5)
+    args = parser.parse_args()
+
+    for backend in args.backends:
+        if backend == 'google' and not os.getenv("GOOGLE_API_KEY"):
+            print(json.dumps({
+                "backend": backend,
+                "skipped": f"GOOGLE_API_KEY is not set, so no Google recall@{args.k} or latency figures were produced "
+                           "and the comparison against the local backend is incomplete"
+            }))
+            continue
+        print(json.dumps(benchmark(backend, args.k)))
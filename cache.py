@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable
+from metrics import metrics
+from dotenv import load_dotenv
+load_dotenv()
+
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "1024"))
+RETRIEVAL_CACHE_TTL = float(os.getenv("RETRIEVAL_CACHE_TTL", "3600"))
+
+
+class ReadWriteLock:
+    def __init__(self):
+        """Many concurrent readers or one writer; waiting writers go ahead of new readers"""
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def read(self):
+        with self._condition:
+            while self._writer or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._condition:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = False
+                self._condition.notify_all()
+
+
+class VersionedCache:
+    def __init__(self, name: str, max_entries: int = RETRIEVAL_CACHE_SIZE, ttl: float = RETRIEVAL_CACHE_TTL):
+        """
+        LRU/TTL cache tied to the version of the data it was computed from. Concurrent misses
+        for the same key are coalesced so the value is computed once, and bumping the version
+        makes every existing entry, including ones still being computed, unreachable.
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached value for key, computing it at most once across concurrent callers"""
+        with self._lock:
+            versioned_key = (self.version, key)
+            entry = self._entries.get(versioned_key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(versioned_key)
+                    metrics.record_cache(self.name, hit=True)
+                    return value
+                del self._entries[versioned_key]
+
+            flight = self._in_flight.get(versioned_key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[versioned_key] = Future()
+
+        # Callers that waited on another caller's computation didn't pay for it, so they count as hits
+        metrics.record_cache(self.name, hit=not leader)
+        if not leader:
+            return flight.result()
+
+        try:
+            value = compute()
+        except BaseException as exc:
+            with self._lock:
+                del self._in_flight[versioned_key]
+            flight.set_exception(exc)
+            raise
+
+        with self._lock:
+            del self._in_flight[versioned_key]
+            if versioned_key[0] == self.version:
+                self._entries[versioned_key] = (time.monotonic() + self.ttl, value)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        flight.set_result(value)
+        return value
+
+    def invalidate(self):
+        """Move to a new version so results computed from the old data are never served again"""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
@@ -3,7 +3,10 @@ from langgraph.graph import StateGraph, MessagesState
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.prebuilt import ToolNode
+from langchain_core.messages import AIMessage, ToolMessage
 from langsmith import traceable
+from metrics import metrics, profiler, COUNT_BUCKETS
+from scheduler import gemini_scheduler, CONTINUATION, NEW, GEMINI_TIMEOUT
 from tools import query_knowledge_base, search_for_product_recommendations, create_new_customer, data_protection_check, place_order, retrieve_existing_customer_orders
 from dotenv import load_dotenv
 load_dotenv()
@@ -31,16 +34,28 @@ llm = ChatGoogleGenerativeAI(
     model="gemini-2.0-flash",
     temperature=0,
     max_tokens=None,
-    timeout=None,
-    max_retries=2,
+    timeout=GEMINI_TIMEOUT,
+    # Throttled calls are retried by gemini_scheduler, so the client must not retry underneath it
+    max_retries=0,
 )
 
 tools = [query_knowledge_base, search_for_product_recommendations, data_protection_check, create_new_customer, place_order, retrieve_existing_customer_orders]
 
 @traceable(run_type="chain")
+@metrics.timed('graph_node_seconds', node='agent')
 def call_agent(message_state: MessagesState):
-    llm_with_prompt = chat_template | llm.bind_tools(tools)
-    response = llm_with_prompt.invoke(message_state)    
+    # Let turns that are already mid tool loop finish before new conversations are admitted
+    last_message = message_state['messages'][-1] if message_state['messages'] else None
+    priority = CONTINUATION if isinstance(last_message, ToolMessage) else NEW
+    # Each attempt gets only what is left of the request's deadline as its client timeout
+    response = gemini_scheduler.call(
+        lambda timeout: (chat_template | llm.bind_tools(tools, timeout=timeout)).invoke(message_state),
+        priority=priority
+    )
+    usage = response.usage_metadata or {}
+    metrics.inc('llm_calls_total', model=llm.model)
+    metrics.inc('llm_tokens_total', usage.get('input_tokens', 0), model=llm.model, type='input')
+    metrics.inc('llm_tokens_total', usage.get('output_tokens', 0), model=llm.model, type='output')
     return {
         'messages': [response]
     }
@@ -54,10 +69,14 @@ def is_tool_call(state: MessagesState):
 
 tool_node = ToolNode(tools)
 
+@metrics.timed('graph_node_seconds', node='tool_node')
+def call_tools(message_state: MessagesState):
+    return tool_node.invoke(message_state)
+
 #graph
 graph = StateGraph(MessagesState)
 graph.add_node('agent', call_agent)
-graph.add_node('tool_node', tool_node)
+graph.add_node('tool_node', call_tools)
 
 graph.add_conditional_edges(
     "agent",
@@ -65,4 +84,16 @@ graph.add_conditional_edges(
 )
 graph.add_edge('tool_node', 'agent')
 graph.set_entry_point('agent')
-app = graph.compile()
\ No newline at end of file
+app = graph.compile()
+
+def run_turn(message_history: list) -> dict:
+    """Run one user turn through the graph, recording turn latency and tool-loop iterations"""
+    with metrics.time('turn_seconds'), profiler.profile('turn'):
+        response = app.invoke({
+            'messages': message_history
+        })
+
+    new_messages = response['messages'][len(message_history):]
+    tool_iterations = sum(1 for message in new_messages if isinstance(message, AIMessage) and message.tool_calls)
+    metrics.observe('tool_loop_iterations', tool_iterations, buckets=COUNT_BUCKETS)
+    return response
\ No newline at end of file
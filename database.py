@@ -3,6 +3,7 @@ import json
 from typing import List, Dict, Optional
 from datetime import datetime
 import os
+from metrics import metrics
 
 class CakeShopDatabase:
     def __init__(self, db_path: str = "cake_shop.db"):
@@ -14,6 +15,7 @@ class CakeShopDatabase:
         """Get database connection"""
         return sqlite3.connect(self.db_path)
     
+    @metrics.timed('sql_method_seconds')
     def init_database(self):
         """Create tables if they don't exist and populate with initial data"""
         conn = self.get_connection()
@@ -91,6 +93,7 @@ class CakeShopDatabase:
         ''', initial_orders)
     
     
+    @metrics.timed('sql_method_seconds')
     def create_customer(self, first_name: str, surname: str, year_of_birth: int, 
                        month_of_birth: int, day_of_birth: int, postcode: str, 
                        first_line_address: str, phone_number: str, email: str) -> str:
@@ -119,6 +122,7 @@ class CakeShopDatabase:
             conn.close()
             return f"Error creating customer: {str(e)}"
     
+    @metrics.timed('sql_method_seconds')
     def get_customer_by_details(self, name: str, postcode: str, year_of_birth: int, 
                                month_of_birth: int, day_of_birth: int) -> Optional[Dict]:
         """Get customer by data protection check details"""
@@ -148,6 +152,7 @@ class CakeShopDatabase:
             }
         return None
     
+    @metrics.timed('sql_method_seconds')
     def get_all_customers(self) -> List[Dict]:
         """Get all customers from database"""
         conn = self.get_connection()
@@ -176,6 +181,7 @@ class CakeShopDatabase:
         return customers
     
     
+    @metrics.timed('sql_method_seconds')
     def create_order(self, items: Dict[str, int], customer_id: str) -> str:
         """Create a new order in the database"""
         conn = self.get_connection()
@@ -202,6 +208,7 @@ class CakeShopDatabase:
             conn.close()
             return f"Error creating order: {str(e)}"
     
+    @metrics.timed('sql_method_seconds')
     def get_customer_orders(self, customer_id: str) -> List[Dict]:
         """Get all orders for a specific customer"""
         conn = self.get_connection()
@@ -232,6 +239,7 @@ class CakeShopDatabase:
         
         return orders
     
+    @metrics.timed('sql_method_seconds')
     def get_all_orders(self) -> List[Dict]:
         """Get all orders from database"""
         conn = self.get_connection()
@@ -258,6 +266,7 @@ class CakeShopDatabase:
         
         return orders
     
+    @metrics.timed('sql_method_seconds')
     def update_order_status(self, order_id: str, new_status: str) -> str:
         """Update order status"""
         conn = self.get_connection()
@@ -283,6 +292,7 @@ class CakeShopDatabase:
             return f"Error updating order: {str(e)}"
     
     
+    @metrics.timed('sql_method_seconds')
     def log_data_protection_check(self, name: str, postcode: str, year_of_birth: int, 
                                  month_of_birth: int, day_of_birth: int):
         """Log a data protection check attempt"""
@@ -297,6 +307,7 @@ class CakeShopDatabase:
         conn.commit()
         conn.close()
     
+    @metrics.timed('sql_method_seconds')
     def get_data_protection_checks(self) -> List[Dict]:
         """Get all data protection check logs"""
         conn = self.get_connection()
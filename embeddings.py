@@ -0,0 +1,99 @@
+import os
+import re
+import zlib
+from functools import lru_cache
+from typing import List, Tuple
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from dotenv import load_dotenv
+load_dotenv()
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "google")
+GOOGLE_MODEL_NAME = 'models/embedding-001'
+LOCAL_DIMENSIONS = int(os.getenv("LOCAL_EMBEDDING_DIMENSIONS", "512"))
+LOCAL_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "64"))
+
+# Bump whenever the tokenisation, stop words, features or weighting change, so old vectors get a new index
+LOCAL_RECIPE_VERSION = 1
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset(
+    "a an and are as at be but by can do does for from how i if in is it its my of on or our so that the "
+    "their there this to was we what when where which who will with you your".split()
+)
+
+
+@lru_cache(maxsize=65536)
+def _hash_feature(feature: str, dimensions: int) -> Tuple[int, float]:
+    """Map a feature to a bucket and a sign; crc32 keeps this stable across processes, unlike hash()"""
+    digest = zlib.crc32(feature.encode())
+    return digest % dimensions, 1.0 if digest & 0x80000000 else -1.0
+
+
+class HashingEmbeddings(Embeddings):
+    def __init__(self, dimensions: int = LOCAL_DIMENSIONS, batch_size: int = LOCAL_BATCH_SIZE):
+        """
+        Offline CPU embedder. Word unigrams, word bigrams and character trigrams are
+        feature-hashed with random signs into a dense vector (a sparse random projection
+        of the TF vector), weighted with sublinear term frequency and L2 normalised.
+
+        Tokenising and hashing are pure Python and hold the GIL, so batches run serially:
+        a thread pool adds overhead without parallelism, and a process pool costs more to
+        start than embedding the whole FAQ and inventory takes (a few milliseconds).
+        """
+        self.dimensions = dimensions
+        self.batch_size = batch_size
+
+    @property
+    def namespace(self) -> str:
+        return f"local-hashing-v{LOCAL_RECIPE_VERSION}-{self.dimensions}"
+
+    def _features(self, text: str) -> List[str]:
+        words = [word for word in TOKEN_PATTERN.findall(text.lower()) if word not in STOP_WORDS]
+        features = [f"w:{word}" for word in words]
+        features += [f"b:{first}_{second}" for first, second in zip(words, words[1:])]
+        for word in words:
+            padded = f"<{word}>"
+            features += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+        return features
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        rows, columns, signs = [], [], []
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                column, sign = _hash_feature(feature, self.dimensions)
+                rows.append(row)
+                columns.append(column)
+                signs.append(sign)
+
+        counts = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        np.add.at(counts, (np.asarray(rows, dtype=np.intp), np.asarray(columns, dtype=np.intp)), np.asarray(signs, dtype=np.float32))
+        vectors = np.sign(counts) * np.log1p(np.abs(counts))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        # Batching bounds the size of the dense count matrix built per call
+        return np.vstack([
+            self._embed_batch(texts[i:i + self.batch_size])
+            for i in range(0, len(texts), self.batch_size)
+        ]).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_batch([text])[0].tolist()
+
+
+def get_embedding_backend(backend: str = EMBEDDING_BACKEND) -> Tuple[Embeddings, str]:
+    """Build the configured embedding model and the namespace its index lives under"""
+    if backend == 'google':
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        embeddings = GoogleGenerativeAIEmbeddings(
+            google_api_key=os.getenv("GOOGLE_API_KEY"),
+            model=GOOGLE_MODEL_NAME
+        )
+        return embeddings, f"google-{GOOGLE_MODEL_NAME.split('/')[-1]}"
+    if backend == 'local':
+        embeddings = HashingEmbeddings()
+        return embeddings, embeddings.namespace
+    raise ValueError(f"Unknown embedding backend: {backend}. Expected 'google' or 'local'")
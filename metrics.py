@@ -0,0 +1,343 @@
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+load_dotenv()
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() not in ("0", "false", "no")
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = os.getenv("METRICS_PORT")
+METRICS_SNAPSHOT_PATH = os.getenv("METRICS_SNAPSHOT_PATH")
+METRICS_SNAPSHOT_INTERVAL = float(os.getenv("METRICS_SNAPSHOT_INTERVAL", "60"))
+SLOW_TURN_SECONDS = os.getenv("METRICS_SLOW_TURN_SECONDS")
+PROFILE_DIR = os.getenv("METRICS_PROFILE_DIR", "./profiles")
+PROFILE_INTERVAL = float(os.getenv("METRICS_PROFILE_INTERVAL", "0.005"))
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21)
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+def _label_set(labels: Dict[str, str]) -> LabelSet:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: LabelSet, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = []
+    for key, value in pairs:
+        value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escaped.append(f'{key}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative_counts(self) -> List[int]:
+        total = 0
+        cumulative = []
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = True):
+        """In-process counters and latency histograms, exportable as Prometheus text or JSON"""
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelSet, float]] = {}
+        self._histograms: Dict[str, Dict[LabelSet, Histogram]] = {}
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """Increment a counter"""
+        if not self.enabled:
+            return
+        key = _label_set(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels):
+        """Record a value in a histogram"""
+        if not self.enabled:
+            return
+        key = _label_set(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def time(self, name: str, **labels):
+        """Record the wall-clock duration of the enclosed block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name: str, **labels) -> Callable:
+        """
+        Decorator recording call latency; labels default to the function name. The call is also
+        attributed to the current slow-turn profile when it runs on another thread, e.g. a tool.
+        """
+        def decorator(func):
+            func_labels = labels or {"function": func.__name__}
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    with profiled_thread():
+                        return func(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start, **func_labels)
+            return wrapper
+        return decorator
+
+    def record_cache(self, cache: str, hit: bool):
+        """Count a cache lookup so hit rates can be derived from cache_requests_total"""
+        self.inc("cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+    def cache_hit_rate(self, cache: str) -> Optional[float]:
+        """Fraction of lookups against the given cache that were hits"""
+        with self._lock:
+            series = self._counters.get("cache_requests_total", {})
+            hits = series.get(_label_set({"cache": cache, "result": "hit"}), 0)
+            misses = series.get(_label_set({"cache": cache, "result": "miss"}), 0)
+        if hits + misses == 0:
+            return None
+        return hits / (hits + misses)
+
+    def reset(self):
+        """Drop all recorded metrics"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict:
+        """Return a JSON-serialisable copy of every counter and histogram"""
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for name, series in self._counters.items()
+                for labels, value in series.items()
+            ]
+            histograms = [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "buckets": list(histogram.buckets),
+                    "counts": histogram.cumulative_counts(),
+                    "sum": histogram.sum,
+                    "count": histogram.count,
+                }
+                for name, series in self._histograms.items()
+                for labels, histogram in series.items()
+            ]
+        return {"timestamp": time.time(), "counters": counters, "histograms": histograms}
+
+    def export_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in series.items():
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in series.items():
+                    for bound, count in zip(histogram.buckets, histogram.cumulative_counts()):
+                        lines.append(f"{name}_bucket{_format_labels(labels, ('le', str(bound)))} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_snapshot(self, path: str):
+        """Append the current snapshot as one line of JSON"""
+        with open(path, 'a') as f:
+            f.write(json.dumps(self.snapshot()) + "\n")
+
+    def start_snapshot_writer(self, path: str, interval: float) -> threading.Thread:
+        """Append a JSONL snapshot to path every interval seconds from a daemon thread"""
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write_snapshot(path)
+                except OSError:
+                    pass
+
+        thread = threading.Thread(target=run, name="metrics-snapshot", daemon=True)
+        thread.start()
+        return thread
+
+    def start_http_server(self, port: int, host: str = METRICS_HOST) -> ThreadingHTTPServer:
+        """Serve the Prometheus text format on /metrics from a daemon thread"""
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.export_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+class TurnThreads:
+    def __init__(self):
+        """Threads currently doing work for one profiled turn, refcounted by thread id"""
+        self._lock = threading.Lock()
+        self._threads: Dict[int, list] = {}
+
+    def add(self, ident: int, name: str):
+        with self._lock:
+            entry = self._threads.setdefault(ident, [name, 0])
+            entry[1] += 1
+
+    def remove(self, ident: int):
+        with self._lock:
+            entry = self._threads[ident]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._threads[ident]
+
+    def snapshot(self) -> Dict[int, str]:
+        with self._lock:
+            return {ident: entry[0] for ident, entry in self._threads.items()}
+
+
+_turn_threads: contextvars.ContextVar = contextvars.ContextVar("turn_threads", default=None)
+
+
+@contextmanager
+def profiled_thread():
+    """Include the current thread in the profile of the turn whose context it runs in"""
+    threads = _turn_threads.get()
+    if threads is None:
+        yield
+        return
+    ident = threading.get_ident()
+    threads.add(ident, threading.current_thread().name)
+    try:
+        yield
+    finally:
+        threads.remove(ident)
+
+
+class SlowTurnProfiler:
+    def __init__(self, threshold: Optional[float], output_dir: str, interval: float):
+        """
+        Sampling profiler that keeps a collapsed-stack profile for turns slower than threshold seconds.
+        Besides the calling thread it samples any worker thread that enters profiled_thread() with the
+        turn's context, such as scheduler attempts, so time spent off-thread isn't just a wait.
+        """
+        self.threshold = threshold
+        self.output_dir = output_dir
+        self.interval = interval
+
+    @contextmanager
+    def profile(self, label: str = "turn"):
+        if self.threshold is None:
+            yield
+            return
+
+        threads = TurnThreads()
+        samples = Counter()
+        stop = threading.Event()
+
+        def sample():
+            while not stop.wait(self.interval):
+                frames = sys._current_frames()
+                for ident, name in threads.snapshot().items():
+                    frame = frames.get(ident)
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                        frame = frame.f_back
+                    if stack:
+                        samples[";".join([name] + stack[::-1])] += 1
+
+        token = _turn_threads.set(threads)
+        sampler = threading.Thread(target=sample, name="metrics-profiler", daemon=True)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            with profiled_thread():
+                yield
+        finally:
+            stop.set()
+            sampler.join()
+            _turn_threads.reset(token)
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.threshold and samples:
+                metrics.inc("slow_turns_total", label=label)
+                try:
+                    self._write(label, elapsed, samples)
+                except OSError:
+                    # A debug hook must never fail the user's turn
+                    pass
+
+    def _write(self, label: str, elapsed: float, samples: Counter):
+        """Write samples in the folded format understood by flamegraph.pl and speedscope"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        file_name = f"{label}-{time.strftime('%Y%m%d-%H%M%S')}-{int(elapsed * 1000)}ms.folded"
+        with open(os.path.join(self.output_dir, file_name), 'w') as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+metrics = MetricsRegistry(enabled=METRICS_ENABLED)
+profiler = SlowTurnProfiler(
+    threshold=float(SLOW_TURN_SECONDS) if SLOW_TURN_SECONDS else None,
+    output_dir=PROFILE_DIR,
+    interval=PROFILE_INTERVAL
+)
+
+if METRICS_ENABLED and METRICS_SNAPSHOT_PATH:
+    metrics.start_snapshot_writer(METRICS_SNAPSHOT_PATH, METRICS_SNAPSHOT_INTERVAL)
+if METRICS_ENABLED and METRICS_PORT:
+    metrics.start_http_server(int(METRICS_PORT), METRICS_HOST)
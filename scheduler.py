@@ -0,0 +1,217 @@
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, List
+from langchain_core.embeddings import Embeddings
+from metrics import metrics, profiled_thread
+from dotenv import load_dotenv
+load_dotenv()
+
+GEMINI_REQUESTS_PER_SECOND = float(os.getenv("GEMINI_REQUESTS_PER_SECOND", "10"))
+GEMINI_BURST = int(os.getenv("GEMINI_BURST", "10"))
+GEMINI_INITIAL_CONCURRENCY = float(os.getenv("GEMINI_INITIAL_CONCURRENCY", "4"))
+GEMINI_MIN_CONCURRENCY = float(os.getenv("GEMINI_MIN_CONCURRENCY", "1"))
+GEMINI_MAX_CONCURRENCY = float(os.getenv("GEMINI_MAX_CONCURRENCY", "32"))
+GEMINI_LATENCY_TARGET = float(os.getenv("GEMINI_LATENCY_TARGET", "8"))
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "60"))
+GEMINI_MAX_ATTEMPTS = int(os.getenv("GEMINI_MAX_ATTEMPTS", "4"))
+GEMINI_MIN_ATTEMPT_TIMEOUT = float(os.getenv("GEMINI_MIN_ATTEMPT_TIMEOUT", "1"))
+
+# Lower values are admitted first
+CONTINUATION = 0
+NEW = 1
+BACKGROUND = 2
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+THROTTLE_TYPE_NAMES = frozenset(["ResourceExhausted", "TooManyRequests"])
+# langchain-google-genai re-raises some API errors as GoogleGenerativeAIError with only the text kept
+WRAPPER_TYPE_NAMES = frozenset(["GoogleGenerativeAIError", "ChatGoogleGenerativeAIError"])
+THROTTLE_MESSAGE = re.compile(r"\b429\b|RESOURCE_EXHAUSTED|Resource has been exhausted")
+
+
+def _status_code(exc: BaseException):
+    for attr in ('code', 'status_code'):
+        code = getattr(exc, attr, None)
+        if callable(code):
+            try:
+                code = code()
+            except Exception:
+                code = None
+        if code is not None:
+            return code
+    return None
+
+
+def is_throttle_error(exc: BaseException) -> bool:
+    """Recognise rate-limit responses from the Gemini SDKs (HTTP 429 / RESOURCE_EXHAUSTED)"""
+    seen = set()
+    current = exc
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        code = _status_code(current)
+        if type(current).__name__ in THROTTLE_TYPE_NAMES or code == 429 or getattr(code, 'name', None) == 'RESOURCE_EXHAUSTED':
+            return True
+        current = current.__cause__
+    return type(exc).__name__ in WRAPPER_TYPE_NAMES and bool(THROTTLE_MESSAGE.search(str(exc)))
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        """Refills rate tokens per second up to capacity"""
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def try_acquire(self) -> float:
+        """Take a token if one is available; otherwise return the seconds until one will be"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionScheduler:
+    def __init__(self, requests_per_second: float = GEMINI_REQUESTS_PER_SECOND, burst: int = GEMINI_BURST,
+                 initial_concurrency: float = GEMINI_INITIAL_CONCURRENCY, min_concurrency: float = GEMINI_MIN_CONCURRENCY,
+                 max_concurrency: float = GEMINI_MAX_CONCURRENCY, latency_target: float = GEMINI_LATENCY_TARGET,
+                 timeout: float = GEMINI_TIMEOUT, max_attempts: int = GEMINI_MAX_ATTEMPTS,
+                 min_attempt_timeout: float = GEMINI_MIN_ATTEMPT_TIMEOUT,
+                 backoff_base: float = 0.5, backoff_cap: float = 8.0, decrease_factor: float = 0.5, name: str = "gemini"):
+        """
+        Admission control for outbound API calls. Callers queue by priority, are rate limited
+        by a token bucket and bounded by an AIMD concurrency window that grows by roughly one
+        slot per window of fast successes and halves on throttling or latency above target.
+        Each attempt runs on a worker thread so the caller gets DeadlineExceeded on time even
+        if the client ignores the timeout it is given; the slot stays taken until it finishes.
+        """
+        self.bucket = TokenBucket(requests_per_second, burst)
+        self.window = initial_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.min_attempt_timeout = min_attempt_timeout
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.decrease_factor = decrease_factor
+        self.name = name
+        self.in_flight = 0
+        self._waiting: List[tuple] = []
+        self._sequence = itertools.count()
+        self._last_decrease = float('-inf')
+        self._condition = threading.Condition()
+        # Slots are only released when an attempt finishes, so in-flight work never exceeds max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(max_concurrency)), thread_name_prefix=f"{name}-scheduler")
+
+    def call(self, func: Callable[[float], Any], priority: int = NEW, timeout: float = None) -> Any:
+        """
+        Run func once admitted, retrying throttled attempts with jittered backoff until the deadline.
+        func receives the seconds left for the attempt and should pass them on as its client timeout.
+        """
+        deadline = time.monotonic() + (timeout if timeout is not None else self.timeout)
+        for attempt in range(self.max_attempts):
+            # Don't start an attempt that couldn't get a useful amount of time
+            self._acquire(priority, deadline - self.min_attempt_timeout)
+            start = time.monotonic()
+            attempt_timeout = deadline - start
+            future = self._executor.submit(contextvars.copy_context().run, self._run_attempt, func, attempt_timeout)
+            future.add_done_callback(lambda done, start=start: self._release(
+                time.monotonic() - start, done.exception() is not None and is_throttle_error(done.exception())
+            ))
+            try:
+                return future.result(timeout=attempt_timeout)
+            except FutureTimeoutError:
+                metrics.inc('scheduler_deadline_exceeded_total', scheduler=self.name)
+                raise DeadlineExceeded(f"Deadline exceeded during a call to {self.name}") from None
+            except Exception as exc:
+                if not is_throttle_error(exc) or attempt == self.max_attempts - 1:
+                    raise
+                delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+                if time.monotonic() + delay + self.min_attempt_timeout >= deadline:
+                    metrics.inc('scheduler_deadline_exceeded_total', scheduler=self.name)
+                    raise DeadlineExceeded(f"Deadline exceeded while backing off from throttling: {exc}") from exc
+                time.sleep(delay)
+
+    @staticmethod
+    def _run_attempt(func: Callable[[float], Any], timeout: float) -> Any:
+        # Runs on a worker thread; a slow-turn profile should show the call itself, not the caller's wait
+        with profiled_thread():
+            return func(timeout)
+
+    def _acquire(self, priority: int, deadline: float):
+        entry = (priority, next(self._sequence))
+        queued_at = time.monotonic()
+        with self._condition:
+            heapq.heappush(self._waiting, entry)
+            try:
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        metrics.inc('scheduler_deadline_exceeded_total', scheduler=self.name)
+                        raise DeadlineExceeded(f"Deadline exceeded waiting for admission to {self.name}")
+                    if self._waiting[0] == entry and self.in_flight < max(1, int(self.window)):
+                        wait = self.bucket.try_acquire()
+                        if wait == 0:
+                            heapq.heappop(self._waiting)
+                            self.in_flight += 1
+                            self._condition.notify_all()
+                            break
+                        self._condition.wait(min(wait, remaining))
+                    else:
+                        self._condition.wait(remaining)
+            except BaseException:
+                if entry in self._waiting:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                self._condition.notify_all()
+                raise
+        metrics.observe('scheduler_queue_seconds', time.monotonic() - queued_at, scheduler=self.name, priority=priority)
+
+    def _release(self, latency: float, throttled: bool):
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled or latency > self.latency_target:
+                # Back off at most once per latency target so a burst of 429s from one window only halves it once
+                if now - self._last_decrease >= self.latency_target:
+                    self.window = max(self.min_concurrency, self.window * self.decrease_factor)
+                    self._last_decrease = now
+                if throttled:
+                    metrics.inc('scheduler_throttled_total', scheduler=self.name)
+            elif self.in_flight + 1 >= self.window / 2:
+                # Only grow while the window is actually in use, otherwise an idle limit drifts to the maximum
+                self.window = min(self.max_concurrency, self.window + 1 / self.window)
+            self._condition.notify_all()
+        metrics.observe('scheduler_call_seconds', latency, scheduler=self.name)
+
+
+class ScheduledEmbeddings(Embeddings):
+    def __init__(self, embeddings: Embeddings, scheduler: AdmissionScheduler):
+        """Route embedding calls through the scheduler; queries run mid-turn so they go ahead of indexing"""
+        self.embeddings = embeddings
+        self.scheduler = scheduler
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # The Google embeddings client has no per-call timeout, so the scheduler's deadline is what bounds these
+        return self.scheduler.call(lambda timeout: self.embeddings.embed_documents(texts), priority=BACKGROUND)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.scheduler.call(lambda timeout: self.embeddings.embed_query(text), priority=CONTINUATION)
+
+
+gemini_scheduler = AdmissionScheduler()
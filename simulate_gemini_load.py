@@ -0,0 +1,110 @@
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from scheduler import AdmissionScheduler, CONTINUATION, NEW
+
+
+class FakeThrottleError(Exception):
+    status_code = 429
+
+
+class FakeGeminiEndpoint:
+    def __init__(self, capacity: int, requests_per_second: float, latency: float, jitter: float):
+        """Local stand-in for the Gemini API: slows down as it fills up and returns 429 past capacity or rate"""
+        self.capacity = capacity
+        self.requests_per_second = requests_per_second
+        self.latency = latency
+        self.jitter = jitter
+        self.in_flight = 0
+        self.recent = []
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, timeout: float = None):
+        with self.lock:
+            now = time.monotonic()
+            self.recent = [t for t in self.recent if now - t < 1]
+            if self.in_flight >= self.capacity or len(self.recent) >= self.requests_per_second:
+                self.throttled += 1
+                raise FakeThrottleError("429 RESOURCE_EXHAUSTED")
+            self.recent.append(now)
+            self.in_flight += 1
+            load = self.in_flight / self.capacity
+        try:
+            latency = self.latency * (1 + load) + random.uniform(0, self.jitter)
+            # Behave like a client honouring its request timeout
+            if timeout is not None and latency > timeout:
+                time.sleep(timeout)
+                raise TimeoutError("fake endpoint request timed out")
+            time.sleep(latency)
+            return "ok"
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def naive_call(endpoint, max_retries: int = 2):
+    """What the client did before: immediate fixed retries with no admission control"""
+    for attempt in range(max_retries + 1):
+        try:
+            return endpoint()
+        except FakeThrottleError:
+            if attempt == max_retries:
+                raise
+            time.sleep(0.1 * (attempt + 1))
+
+
+def run_conversation(endpoint, scheduler, tool_iterations: int, timeout: float):
+    start = time.monotonic()
+    try:
+        for step in range(tool_iterations + 1):
+            if scheduler is None:
+                naive_call(endpoint)
+            else:
+                scheduler.call(endpoint, priority=NEW if step == 0 else CONTINUATION, timeout=timeout)
+        return time.monotonic() - start, None
+    except (FakeThrottleError, TimeoutError) as exc:
+        return time.monotonic() - start, type(exc).__name__
+
+
+def simulate(conversations: int, clients: int, use_scheduler: bool, args) -> dict:
+    endpoint = FakeGeminiEndpoint(args.capacity, args.endpoint_rps, args.latency, args.jitter)
+    scheduler = AdmissionScheduler(requests_per_second=args.endpoint_rps * 0.9, burst=args.capacity,
+                                   latency_target=args.latency * 2, timeout=args.timeout,
+                                   backoff_base=0.05, backoff_cap=1.0, name="fake") if use_scheduler else None
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        results = list(executor.map(
+            lambda _: run_conversation(endpoint, scheduler, random.randint(0, 2), args.timeout),
+            range(conversations)
+        ))
+
+    latencies = [latency for latency, error in results if error is None]
+    errors = [error for _, error in results if error is not None]
+    return {
+        "scheduler": use_scheduler,
+        "completed": len(latencies),
+        "failed": len(errors),
+        "throttled_by_endpoint": endpoint.throttled,
+        "turn_p50_s": float(np.percentile(latencies, 50)) if latencies else None,
+        "turn_p99_s": float(np.percentile(latencies, 99)) if latencies else None,
+        "final_window": scheduler.window if scheduler else None,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Drive the admission scheduler against a fake throttling endpoint")
+    parser.add_argument('--conversations', type=int, default=200)
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--capacity', type=int, default=8)
+    parser.add_argument('--endpoint-rps', type=float, default=40)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--timeout', type=float, default=10)
+    args = parser.parse_args()
+
+    for use_scheduler in (False, True):
+        print(json.dumps(simulate(args.conversations, args.clients, use_scheduler, args)))
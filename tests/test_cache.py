@@ -0,0 +1,123 @@
+import threading
+import time
+from cache import ReadWriteLock, VersionedCache
+
+
+def test_concurrent_identical_misses_compute_once():
+    cache = VersionedCache('test-single-flight')
+    calls = []
+    start = threading.Event()
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return ['doc']
+
+    results = []
+
+    def worker():
+        start.wait()
+        results.append(cache.get_or_compute('query', compute))
+
+    threads = [threading.Thread(target=worker) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    start.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [['doc']] * 10
+
+
+def test_failed_computation_is_not_cached():
+    cache = VersionedCache('test-errors')
+
+    def fail():
+        raise RuntimeError("vector store down")
+
+    for _ in range(2):
+        try:
+            cache.get_or_compute('query', fail)
+        except RuntimeError:
+            pass
+    assert cache.get_or_compute('query', lambda: 'ok') == 'ok'
+
+
+def test_entries_expire_after_ttl():
+    cache = VersionedCache('test-ttl', ttl=0.05)
+    calls = []
+    cache.get_or_compute('query', lambda: calls.append(1))
+    cache.get_or_compute('query', lambda: calls.append(1))
+    assert len(calls) == 1
+
+    time.sleep(0.06)
+    cache.get_or_compute('query', lambda: calls.append(1))
+    assert len(calls) == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = VersionedCache('test-lru', max_entries=2)
+    calls = []
+
+    def compute(key):
+        return lambda: calls.append(key) or key
+
+    cache.get_or_compute('a', compute('a'))
+    cache.get_or_compute('b', compute('b'))
+    cache.get_or_compute('a', compute('a'))
+    cache.get_or_compute('c', compute('c'))
+    assert calls == ['a', 'b', 'c']
+
+    cache.get_or_compute('a', compute('a'))
+    cache.get_or_compute('b', compute('b'))
+    assert calls == ['a', 'b', 'c', 'b']
+
+
+def test_result_computed_before_invalidate_is_never_served_after_it():
+    cache = VersionedCache('test-invalidate')
+    computing = threading.Event()
+    finish = threading.Event()
+
+    def stale():
+        computing.set()
+        finish.wait()
+        return 'stale'
+
+    thread = threading.Thread(target=cache.get_or_compute, args=('query', stale))
+    thread.start()
+    computing.wait()
+    cache.invalidate()
+    finish.set()
+    thread.join()
+
+    assert cache.get_or_compute('query', lambda: 'fresh') == 'fresh'
+
+    cache.invalidate()
+    assert cache.get_or_compute('query', lambda: 'fresher') == 'fresher'
+
+
+def test_writer_excludes_readers():
+    lock = ReadWriteLock()
+    events = []
+    writing = threading.Event()
+
+    def writer():
+        with lock.write():
+            writing.set()
+            events.append('write-start')
+            time.sleep(0.05)
+            events.append('write-end')
+
+    def reader():
+        writing.wait()
+        with lock.read():
+            events.append('read')
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert events[:2] == ['write-start', 'write-end']
+    assert events[2:] == ['read'] * 3
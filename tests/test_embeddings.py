@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from embeddings import HashingEmbeddings, get_embedding_backend
+
+
+def test_embeddings_are_deterministic():
+    first = HashingEmbeddings().embed_query("Do you deliver wedding cakes?")
+    second = HashingEmbeddings().embed_query("Do you deliver wedding cakes?")
+    assert first == second
+
+
+def test_embeddings_have_unit_norm_and_configured_size():
+    embeddings = HashingEmbeddings(dimensions=128)
+    vectors = np.array(embeddings.embed_documents(["Chocolate fudge cake", "Gluten free options", "Delivery times"]))
+    assert vectors.shape == (3, 128)
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-6)
+
+
+def test_empty_text_embeds_to_zero_vector():
+    embeddings = HashingEmbeddings(dimensions=64)
+    assert embeddings.embed_query("") == [0.0] * 64
+    # Stop words alone carry no features either
+    assert embeddings.embed_query("what is the") == [0.0] * 64
+    assert embeddings.embed_documents([]) == []
+
+
+def test_embed_documents_matches_embed_query_across_batches():
+    embeddings = HashingEmbeddings(batch_size=2)
+    texts = ["Red velvet cake", "Carrot cake with walnuts", "Birthday cupcakes", "Vegan lemon drizzle", ""]
+    documents = embeddings.embed_documents(texts)
+    assert len(documents) == len(texts)
+    for text, vector in zip(texts, documents):
+        assert np.allclose(vector, embeddings.embed_query(text))
+
+
+def test_similar_texts_score_higher_than_unrelated_ones():
+    embeddings = HashingEmbeddings()
+    query = np.array(embeddings.embed_query("chocolate birthday cake"))
+    related = np.array(embeddings.embed_query("A chocolate cake for birthdays"))
+    unrelated = np.array(embeddings.embed_query("How do I reset my delivery address?"))
+    assert query @ related > query @ unrelated
+
+
+def test_local_backend_namespace_includes_recipe_version_and_dimensions():
+    embeddings, namespace = get_embedding_backend('local')
+    assert isinstance(embeddings, HashingEmbeddings)
+    assert namespace == embeddings.namespace
+    assert namespace.startswith('local-hashing-v')
+    assert namespace.endswith(f"-{embeddings.dimensions}")
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="Unknown embedding backend"):
+        get_embedding_backend('openai')
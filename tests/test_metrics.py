@@ -0,0 +1,124 @@
+import contextvars
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from metrics import COUNT_BUCKETS, MetricsRegistry, SlowTurnProfiler, profiled_thread
+
+
+def test_histogram_buckets_are_cumulative_with_inf_bucket():
+    registry = MetricsRegistry()
+    for value in (0, 1, 1, 4, 50):
+        registry.observe('tool_loop_iterations', value, buckets=COUNT_BUCKETS)
+
+    lines = registry.export_prometheus().splitlines()
+    assert '# TYPE tool_loop_iterations histogram' in lines
+    assert 'tool_loop_iterations_bucket{le="0"} 1' in lines
+    assert 'tool_loop_iterations_bucket{le="1"} 3' in lines
+    assert 'tool_loop_iterations_bucket{le="3"} 3' in lines
+    assert 'tool_loop_iterations_bucket{le="5"} 4' in lines
+    assert 'tool_loop_iterations_bucket{le="21"} 4' in lines
+    assert 'tool_loop_iterations_bucket{le="+Inf"} 5' in lines
+    assert 'tool_loop_iterations_sum 56.0' in lines
+    assert 'tool_loop_iterations_count 5' in lines
+
+
+def test_prometheus_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.inc('errors_total', reason='say "hi"\\now\nbye')
+    assert 'errors_total{reason="say \\"hi\\"\\\\now\\nbye"} 1' in registry.export_prometheus().splitlines()
+
+
+def test_cache_hit_rate():
+    registry = MetricsRegistry()
+    assert registry.cache_hit_rate('faq') is None
+    for hit in (True, True, True, False):
+        registry.record_cache('faq', hit)
+    registry.record_cache('inventory', False)
+    assert registry.cache_hit_rate('faq') == 0.75
+    assert registry.cache_hit_rate('inventory') == 0
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+    registry.inc('llm_calls_total')
+    registry.observe('turn_seconds', 1.0)
+    assert registry.snapshot()['counters'] == []
+    assert registry.snapshot()['histograms'] == []
+
+
+def test_write_snapshot_appends_jsonl(tmp_path):
+    registry = MetricsRegistry()
+    path = str(tmp_path / 'metrics.jsonl')
+    registry.inc('llm_tokens_total', 12, type='input')
+    registry.write_snapshot(path)
+    registry.observe('turn_seconds', 0.2)
+    registry.write_snapshot(path)
+
+    with open(path) as f:
+        snapshots = [json.loads(line) for line in f]
+    assert len(snapshots) == 2
+    assert snapshots[0]['counters'] == [{"name": "llm_tokens_total", "labels": {"type": "input"}, "value": 12}]
+    assert snapshots[0]['histograms'] == []
+    histogram = snapshots[1]['histograms'][0]
+    assert histogram['name'] == 'turn_seconds'
+    assert histogram['count'] == 1
+    assert histogram['counts'][-1] == 1
+    assert snapshots[1] == json.loads(json.dumps(snapshots[1]))
+
+
+def test_timed_records_latency_and_keeps_tool_schema():
+    from langchain_core.tools import tool
+    registry = MetricsRegistry()
+
+    @tool
+    @registry.timed('tool_seconds')
+    def lookup_order(order_id: str, include_items: bool = False) -> str:
+        """
+        Look up an order.
+
+        Args:
+            order_id (str): The order to look up
+            include_items (bool): Whether to list the items
+        """
+        return f"{order_id}:{include_items}"
+
+    assert lookup_order.name == 'lookup_order'
+    assert 'Look up an order.' in lookup_order.description
+    assert set(lookup_order.args) == {'order_id', 'include_items'}
+    assert lookup_order.args['order_id']['type'] == 'string'
+    assert lookup_order.args['include_items']['type'] == 'boolean'
+    assert lookup_order.invoke({'order_id': 'ORD001'}) == 'ORD001:False'
+
+    histogram = registry.snapshot()['histograms'][0]
+    assert histogram['labels'] == {'function': 'lookup_order'}
+    assert histogram['count'] == 1
+
+
+def test_slow_turn_profile_includes_worker_threads(tmp_path):
+    profiler = SlowTurnProfiler(threshold=0, output_dir=str(tmp_path), interval=0.002)
+
+    def busy_worker_call():
+        with profiled_thread():
+            deadline = time.perf_counter() + 0.1
+            while time.perf_counter() < deadline:
+                pass
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="worker") as executor:
+        with profiler.profile('turn'):
+            executor.submit(contextvars.copy_context().run, busy_worker_call).result()
+
+    [profile] = os.listdir(tmp_path)
+    with open(tmp_path / profile) as f:
+        stacks = f.read()
+    assert 'test_metrics.py:busy_worker_call' in stacks
+    assert any(line.startswith('worker') for line in stacks.splitlines())
+
+
+def test_profiler_write_errors_do_not_fail_the_turn(tmp_path):
+    blocker = tmp_path / 'not-a-directory'
+    blocker.write_text('')
+    profiler = SlowTurnProfiler(threshold=0, output_dir=str(blocker / 'profiles'), interval=0.001)
+    with profiler.profile('turn'):
+        time.sleep(0.02)
+
@@ -0,0 +1,140 @@
+import threading
+import time
+import pytest
+from scheduler import AdmissionScheduler, BACKGROUND, CONTINUATION, NEW, DeadlineExceeded, is_throttle_error
+from simulate_gemini_load import FakeGeminiEndpoint, FakeThrottleError
+
+
+def make_scheduler(**overrides):
+    options = dict(requests_per_second=1000, burst=1000, initial_concurrency=1, min_concurrency=1,
+                   max_concurrency=4, latency_target=1, timeout=5, max_attempts=3,
+                   min_attempt_timeout=0.01, backoff_base=0.001, backoff_cap=0.01, name="test")
+    options.update(overrides)
+    return AdmissionScheduler(**options)
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.001)
+
+
+def occupy_slot(scheduler):
+    """Hold the only concurrency slot until the returned event is set"""
+    release = threading.Event()
+    thread = threading.Thread(target=scheduler.call, args=(lambda timeout: release.wait(),))
+    thread.start()
+    wait_for(lambda: scheduler.in_flight == 1)
+    return release, thread
+
+
+def test_continuations_are_admitted_before_new_and_background_calls():
+    scheduler = make_scheduler(max_concurrency=1)
+    release, holder = occupy_slot(scheduler)
+    admitted = []
+    threads = []
+    for priority in (BACKGROUND, NEW, CONTINUATION):
+        thread = threading.Thread(target=scheduler.call, args=(lambda timeout, p=priority: admitted.append(p),), kwargs={"priority": priority})
+        thread.start()
+        threads.append(thread)
+        wait_for(lambda: len(scheduler._waiting) == len(threads))
+
+    release.set()
+    for thread in [holder] + threads:
+        thread.join()
+    assert admitted == [CONTINUATION, NEW, BACKGROUND]
+
+
+def test_queued_call_raises_deadline_exceeded():
+    scheduler = make_scheduler(max_concurrency=1)
+    release, holder = occupy_slot(scheduler)
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        scheduler.call(lambda timeout: "never", timeout=0.1)
+    assert time.monotonic() - start < 0.5
+    assert scheduler._waiting == []
+    release.set()
+    holder.join()
+
+
+def test_running_call_is_bounded_by_the_deadline():
+    scheduler = make_scheduler()
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        scheduler.call(lambda timeout: time.sleep(0.5), timeout=0.1)
+    assert time.monotonic() - start < 0.3
+    # The slot is held until the abandoned attempt actually finishes
+    assert scheduler.in_flight == 1
+    wait_for(lambda: scheduler.in_flight == 0)
+
+
+def test_attempt_receives_remaining_budget_and_is_skipped_when_too_small():
+    scheduler = make_scheduler(min_attempt_timeout=0.5)
+    budgets = []
+    scheduler.call(lambda timeout: budgets.append(timeout), timeout=2)
+    assert 1.5 < budgets[0] <= 2
+
+    with pytest.raises(DeadlineExceeded):
+        scheduler.call(lambda timeout: budgets.append(timeout), timeout=0.2)
+    assert len(budgets) == 1
+
+
+def test_window_halves_on_throttling_and_recovers():
+    scheduler = make_scheduler(initial_concurrency=2, max_attempts=1, latency_target=0.05)
+    throttling = FakeGeminiEndpoint(capacity=0, requests_per_second=1000, latency=0, jitter=0)
+    with pytest.raises(FakeThrottleError):
+        scheduler.call(throttling)
+    wait_for(lambda: scheduler.in_flight == 0)
+    assert scheduler.window == 1
+
+    healthy = FakeGeminiEndpoint(capacity=8, requests_per_second=1000, latency=0.001, jitter=0)
+    for _ in range(5):
+        scheduler.call(healthy)
+    wait_for(lambda: scheduler.in_flight == 0)
+    assert scheduler.window >= 2
+
+
+def test_scheduler_owns_retries_for_throttled_calls_only():
+    # The chat client runs with max_retries=0, so every retry has to come from here
+    scheduler = make_scheduler(max_attempts=3)
+    endpoint = FakeGeminiEndpoint(capacity=0, requests_per_second=1000, latency=0, jitter=0)
+    with pytest.raises(FakeThrottleError):
+        scheduler.call(endpoint)
+    assert endpoint.throttled == 3
+
+    attempts = []
+
+    def failing(timeout):
+        attempts.append(timeout)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        scheduler.call(failing)
+    assert len(attempts) == 1
+
+
+class GoogleGenerativeAIError(Exception):
+    pass
+
+
+class ResourceExhausted(Exception):
+    pass
+
+
+def test_is_throttle_error_matches_status_codes_not_arbitrary_text():
+    assert is_throttle_error(FakeThrottleError("slow down"))
+    assert is_throttle_error(ResourceExhausted("quota"))
+    assert is_throttle_error(GoogleGenerativeAIError("Error embedding content: 429 Resource has been exhausted"))
+
+    try:
+        try:
+            raise ResourceExhausted("quota")
+        except ResourceExhausted as cause:
+            raise GoogleGenerativeAIError("Error embedding content") from cause
+    except GoogleGenerativeAIError as wrapped:
+        assert is_throttle_error(wrapped)
+
+    assert not is_throttle_error(ValueError("prompt has 4290 tokens"))
+    assert not is_throttle_error(ValueError("429"))
+    assert not is_throttle_error(GoogleGenerativeAIError("prompt has 4290 tokens"))
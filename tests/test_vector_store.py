@@ -0,0 +1,113 @@
+import json
+import os
+import threading
+import pytest
+
+pytest.importorskip("langchain_chroma")
+import vector_store
+from vector_store import CakeShopVectorStore
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    monkeypatch.setattr(vector_store, 'DB_PATH', str(tmp_path / 'chroma'))
+    return CakeShopVectorStore(backend='local')
+
+
+def write_faqs(path, faqs):
+    with open(path, 'w') as f:
+        json.dump(faqs, f)
+    return str(path)
+
+
+def test_reload_invalidates_cached_results(store, tmp_path):
+    before = store.query_faqs("Do you deliver wedding cakes?")
+    assert before
+    assert store.query_faqs("  do you DELIVER wedding cakes? ") == before
+
+    faq_file = write_faqs(tmp_path / 'faq.json', [
+        {"question": "Do you sell gluten free brownies?", "answer": "Yes, every day."}
+    ])
+    store.reload_faq_collection(faq_file)
+
+    after = store.query_faqs("Do you deliver wedding cakes?")
+    assert {document.metadata['question'] for document, _ in after} == {"Do you sell gluten free brownies?"}
+
+
+def test_queries_never_see_a_partially_reloaded_collection(store, tmp_path):
+    faq_file = write_faqs(tmp_path / 'faq.json', [
+        {"question": f"Question {i} about cakes?", "answer": f"Answer {i} about cakes."} for i in range(20)
+    ])
+    stop = threading.Event()
+    result_sizes = []
+
+    def query():
+        while not stop.is_set():
+            # Vary the text so every query reaches the collection instead of the cache
+            result_sizes.append(len(store.query_faqs(f"cakes {len(result_sizes)}")))
+
+    readers = [threading.Thread(target=query) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for _ in range(3):
+        store.reload_faq_collection(faq_file)
+    stop.set()
+    for reader in readers:
+        reader.join()
+
+    assert result_sizes
+    assert min(result_sizes) == 5
+
+
+def test_failed_reload_keeps_old_documents_and_cache(store, tmp_path, monkeypatch):
+    before = store.query_faqs("Do you deliver wedding cakes?")
+    version = store.faq_cache.version
+
+    def outage(texts):
+        raise RuntimeError("embedding service unavailable")
+
+    monkeypatch.setattr(store.embedding_function, 'embed_documents', outage)
+    faq_file = write_faqs(tmp_path / 'faq.json', [{"question": "New question?", "answer": "New answer."}])
+    with pytest.raises(RuntimeError):
+        store.reload_faq_collection(faq_file)
+
+    assert store.faq_cache.version == version
+    assert store.faq_collection.get()['ids']
+    monkeypatch.undo()
+    assert store.query_faqs("Do you deliver wedding cakes?") == before
+    assert len(store.query_faqs("Can I order a birthday cake online?")) == 5
+
+
+def test_queries_are_not_blocked_while_a_reload_embeds(store, tmp_path, monkeypatch):
+    embedding_started = threading.Event()
+    finish_embedding = threading.Event()
+    embed_documents = store.embedding_function.embed_documents
+
+    def slow_embed_documents(texts):
+        embedding_started.set()
+        finish_embedding.wait()
+        return embed_documents(texts)
+
+    monkeypatch.setattr(store.embedding_function, 'embed_documents', slow_embed_documents)
+    faq_file = write_faqs(tmp_path / 'faq.json', [
+        {"question": "Do you sell gluten free brownies?", "answer": "Yes, every day."}
+    ])
+    reload = threading.Thread(target=store.reload_faq_collection, args=(faq_file,))
+    reload.start()
+    try:
+        assert embedding_started.wait(5)
+        results = []
+        query = threading.Thread(target=lambda: results.append(store.query_faqs("Do you deliver wedding cakes?")))
+        query.start()
+        query.join(2)
+        assert not query.is_alive()
+        assert len(results[0]) == 5
+    finally:
+        finish_embedding.set()
+        reload.join()
+
+    after = store.query_faqs("Do you deliver wedding cakes?")
+    assert {document.metadata['question'] for document, _ in after} == {"Do you sell gluten free brownies?"}
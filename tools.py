@@ -2,12 +2,14 @@ from langchain_core.tools import tool
 from typing import List, Dict
 from vector_store import CakeShopVectorStore
 from database import db
+from metrics import metrics
 import json
 import os
 
 vector_store = CakeShopVectorStore()
 
 @tool
+@metrics.timed('tool_seconds')
 def query_knowledge_base(query: str) -> List[Dict[str, str]]:
     """
     Look up information in the knowledge base to help with answering customer questions and getting information on business processes.
@@ -22,6 +24,7 @@ def query_knowledge_base(query: str) -> List[Dict[str, str]]:
 
 
 @tool
+@metrics.timed('tool_seconds')
 def search_for_product_recommendations(description: str):
     """
     Look up information in the knowledge base to help with product recommendation for customers. For example:
@@ -39,6 +42,7 @@ def search_for_product_recommendations(description: str):
     return vector_store.query_inventories(description)
 
 @tool
+@metrics.timed('tool_seconds')
 def data_protection_check(name: str, postcode: str, year_of_birth: int, month_of_birth: int, day_of_birth: int) -> Dict:
     """
     Perform a data protection check against a customer to retrieve customer details.
@@ -65,6 +69,7 @@ def data_protection_check(name: str, postcode: str, year_of_birth: int, month_of
         return "DPA check failed, no customer with these details found"
 
 @tool
+@metrics.timed('tool_seconds')
 def create_new_customer(first_name: str, surname: str, year_of_birth: int, month_of_birth: int, day_of_birth: int, postcode: str, first_line_of_address: str, phone_number: str, email: str) -> str:
     """
     Creates a customer profile, so that they can place orders.
@@ -90,6 +95,7 @@ def create_new_customer(first_name: str, surname: str, year_of_birth: int, month
                              day_of_birth, postcode, first_line_of_address, phone_number, email)
     
 @tool
+@metrics.timed('tool_seconds')
 def retrieve_existing_customer_orders(customer_id: str) -> List[Dict]:
     """
     Retrieves the orders associated with the customer, including their status, items and ids
@@ -108,6 +114,7 @@ def retrieve_existing_customer_orders(customer_id: str) -> List[Dict]:
 with open('cake_inventory.json', 'r') as f:
     inventory_database = json.load(f)
 @tool
+@metrics.timed('tool_seconds')
 def place_order(items: Dict[str, int], customer_id: str) -> str:
     """
     Places an order for the requested items, and for the required quantities.
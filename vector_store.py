@@ -1,15 +1,19 @@
+import chromadb
 from langchain_chroma import Chroma
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from typing import List, Dict, Any
+from langchain_core.embeddings import Embeddings
+from typing import List, Dict, Any, Optional
 import json
 import os
+import uuid
 from langsmith import traceable
+from metrics import metrics
+from embeddings import get_embedding_backend, EMBEDDING_BACKEND
+from scheduler import ScheduledEmbeddings, gemini_scheduler
+from cache import VersionedCache, ReadWriteLock
 from dotenv import load_dotenv
 load_dotenv()
 
-API_KEY = os.getenv("GOOGLE_API_KEY")
-MODEL_NAME = 'models/embedding-001'
 DB_PATH = './.chroma_db'
 FAQ_FILE_PATH= './cake_FAQ.json'
 INVENTORY_FILE_PATH = './cake_inventory.json'
@@ -28,24 +32,71 @@ class QuestionAnswerPairs:
         self.question = question
         self.answer = answer
 
+class InstrumentedEmbeddings(Embeddings):
+    def __init__(self, embeddings: Embeddings, backend: str):
+        """Wrap an embedding model to count calls, texts and latency per backend"""
+        self.embeddings = embeddings
+        self.backend = backend
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        metrics.inc('embedding_calls_total', backend=self.backend, kind='documents')
+        metrics.inc('embedding_texts_total', len(texts), backend=self.backend)
+        with metrics.time('embedding_seconds', backend=self.backend, kind='documents'):
+            return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        metrics.inc('embedding_calls_total', backend=self.backend, kind='query')
+        metrics.inc('embedding_texts_total', backend=self.backend)
+        with metrics.time('embedding_seconds', backend=self.backend, kind='query'):
+            return self.embeddings.embed_query(text)
+
+# The original index was built with embedding-001 before backends were namespaced, so that
+# namespace keeps the unsuffixed collection names and the existing .chroma_db is reused as is
+LEGACY_NAMESPACE = 'google-embedding-001'
+
+def _collection_name(base: str, namespace: str) -> str:
+    return base if namespace == LEGACY_NAMESPACE else f"{base}-{namespace}"
+
+def _collection_metadata(namespace: str) -> Optional[Dict[str, str]]:
+    # New collections use cosine distance so LangChain's relevance scores land in [0, 1];
+    # the legacy collections keep the l2 space they were created with
+    return None if namespace == LEGACY_NAMESPACE else {"hnsw:space": "cosine"}
+
+def _cache_key(query: str, k: int, filter: Optional[Dict[str, Any]]) -> tuple:
+    normalized_query = " ".join(query.lower().split())
+    return normalized_query, k, json.dumps(filter, sort_keys=True, default=str)
+
 class CakeShopVectorStore:
-    def __init__(self):
-        # Initialize Google Generative AI Embeddings
-        self.embedding_function = GoogleGenerativeAIEmbeddings(
-            google_api_key=API_KEY,
-            model=MODEL_NAME
-        )
+    def __init__(self, backend: str = EMBEDDING_BACKEND):
+        # Retrieval results are cached per collection and invalidated whenever that collection is (re)loaded
+        self.faq_cache = VersionedCache('faq')
+        self.inventory_cache = VersionedCache('inventory')
+        # Queries hold the read side; a reload only takes the write side to swap in already-embedded documents
+        self.faq_lock = ReadWriteLock()
+        self.inventory_lock = ReadWriteLock()
+
+        # Initialize the configured embedding backend
+        embeddings, self.namespace = get_embedding_backend(backend)
+        if backend == 'google':
+            # Remote embedding calls share admission control with the chat model
+            embeddings = ScheduledEmbeddings(embeddings, gemini_scheduler)
+        self.embedding_function = InstrumentedEmbeddings(embeddings, backend=backend)
 
-        # Create or get Chroma collections
+        # Create or get Chroma collections, namespaced per backend so vectors from different models never mix
+        self.chroma_client = chromadb.PersistentClient(path=DB_PATH)
+        self.faq_collection_name = _collection_name("FAQ", self.namespace)
+        self.inventory_collection_name = _collection_name("Inventory", self.namespace)
         self.faq_collection = Chroma(
-            collection_name="FAQ",
-            embedding_function=self.embedding_function,
-            persist_directory=DB_PATH
+            client=self.chroma_client,
+            collection_name=self.faq_collection_name,
+            collection_metadata=_collection_metadata(self.namespace),
+            embedding_function=self.embedding_function
         )
         self.inventory_collection = Chroma(
-            collection_name="Inventory",
-            embedding_function=self.embedding_function,
-            persist_directory=DB_PATH
+            client=self.chroma_client,
+            collection_name=self.inventory_collection_name,
+            collection_metadata=_collection_metadata(self.namespace),
+            embedding_function=self.embedding_function
         )
         
         # Load data if collections are empty
@@ -76,11 +127,7 @@ class CakeShopVectorStore:
                 texts.append(chunk)
                 metadatas.append({"type": "answer_chunk", "question": faq['question'], "answer": chunk})
 
-        # Add documents to collection
-        self.faq_collection.add_texts(
-            texts=texts,
-            metadatas=metadatas
-        )
+        self._replace_documents(self.faq_collection_name, self.faq_lock, self.faq_cache, texts, metadatas)
 
     def _load_inventory_collection(self, inventory_file_path: str):
         with open(inventory_file_path, 'r') as f:
@@ -100,22 +147,58 @@ class CakeShopVectorStore:
                 meta['description'] = chunk
                 metadatas.append(meta)
 
-        # Add documents to collection
-        self.inventory_collection.add_texts(
-            texts=texts,
-            metadatas=metadatas
-        )
+        self._replace_documents(self.inventory_collection_name, self.inventory_lock, self.inventory_cache, texts, metadatas)
+
+    def _replace_documents(self, collection_name: str, lock: ReadWriteLock, cache: VersionedCache,
+                           texts: List[str], metadatas: List[Dict[str, Any]]):
+        """Swap a collection's documents for new ones without queries ever seeing it empty or half loaded"""
+        # Embedding is the slow, failure-prone step, so it runs before anything is touched:
+        # if it raises, the old documents and cached results stay in place
+        embeddings = self.embedding_function.embed_documents(texts)
+        collection = self.chroma_client.get_collection(collection_name)
+        with lock.write():
+            old_ids = collection.get(include=[])['ids']
+            collection.add(
+                ids=[str(uuid.uuid4()) for _ in texts],
+                embeddings=embeddings,
+                metadatas=metadatas,
+                documents=texts
+            )
+            if old_ids:
+                collection.delete(ids=old_ids)
+            cache.invalidate()
+
+    def reload_faq_collection(self, faq_file_path: str = FAQ_FILE_PATH):
+        """Replace the FAQ collection with the contents of faq_file_path"""
+        self._load_faq_collection(faq_file_path)
+
+    def reload_inventory_collection(self, inventory_file_path: str = INVENTORY_FILE_PATH):
+        """Replace the inventory collection with the contents of inventory_file_path"""
+        self._load_inventory_collection(inventory_file_path)
+
     @traceable
-    def query_faqs(self, query: str) -> Dict[str, Any]:
+    @metrics.timed('retrieval_seconds')
+    def query_faqs(self, query: str, k: int = 5, filter: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Query FAQ collection and return relevant results."""
-        return self.faq_collection.similarity_search_with_relevance_scores(
-            query=query,
-            k=5
-        )
+        with self.faq_lock.read():
+            return list(self.faq_cache.get_or_compute(
+                _cache_key(query, k, filter),
+                lambda: self.faq_collection.similarity_search_with_relevance_scores(
+                    query=query,
+                    k=k,
+                    filter=filter
+                )
+            ))
     @traceable
-    def query_inventories(self, query: str) -> Dict[str, Any]:
+    @metrics.timed('retrieval_seconds')
+    def query_inventories(self, query: str, k: int = 5, filter: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Query inventory collection and return relevant results."""
-        return self.inventory_collection.similarity_search_with_relevance_scores(
-            query=query,
-            k=5
-        )
+        with self.inventory_lock.read():
+            return list(self.inventory_cache.get_or_compute(
+                _cache_key(query, k, filter),
+                lambda: self.inventory_collection.similarity_search_with_relevance_scores(
+                    query=query,
+                    k=k,
+                    filter=filter
+                )
+            ))